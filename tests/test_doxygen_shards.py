@@ -0,0 +1,158 @@
+# Copyright 2024 - 2025 Khalil Estell and the libhal contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of sharded doxygen runs in scripts/api.py against a serial run.
+
+The comparisons need doxygen on the PATH and are skipped without it.
+"""
+
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+spec = importlib.util.spec_from_file_location(
+    "api", os.path.join(ROOT, "scripts", "api.py"))
+api = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(api)
+
+DOXYFILE = """\
+PROJECT_NAME = fixture
+INPUT = include
+RECURSIVE = YES
+FILE_PATTERNS = *.hpp
+EXAMPLE_PATH = examples
+OUTPUT_DIRECTORY = build
+GENERATE_XML = YES
+GENERATE_HTML = NO
+GENERATE_LATEX = NO
+QUIET = YES
+"""
+
+# Two directories, so two shards, each with one class that documents an
+# example from EXAMPLE_PATH
+INDEPENDENT_SOURCES = {
+    "include/alpha/alpha.hpp": """\
+namespace fixture {
+/**
+ * @brief Alpha.
+ *
+ * @include use_alpha.cpp
+ */
+class alpha
+{
+public:
+  /// Value of alpha
+  int value();
+};
+}  // namespace fixture
+""",
+    "include/beta/beta.hpp": """\
+namespace fixture {
+/// @brief Beta.
+class beta
+{
+public:
+  /// Size of beta
+  int size();
+};
+}  // namespace fixture
+""",
+    "examples/use_alpha.cpp": """\
+fixture::alpha instance;
+""",
+}
+
+# beta derives from alpha across the two shards, which a shard cannot resolve
+CROSS_SHARD_SOURCES = dict(INDEPENDENT_SOURCES)
+CROSS_SHARD_SOURCES["include/beta/beta.hpp"] = """\
+#include "../alpha/alpha.hpp"
+namespace fixture {
+/// @brief Beta.
+class beta : public alpha
+{
+public:
+  /// Size of beta
+  int size();
+};
+}  // namespace fixture
+"""
+
+
+class DoxygenShardTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.source_dir = os.path.join(self.work_dir, "source")
+        self.scratch_dir = os.path.join(self.work_dir, "scratch")
+        os.makedirs(self.scratch_dir)
+
+    def write_fixture(self, sources: dict):
+        files = dict(sources)
+        files["doxygen.conf"] = DOXYFILE
+        for path, content in files.items():
+            path = os.path.join(self.source_dir, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+
+    def test_only_input_files_are_sharded(self):
+        self.write_fixture(INDEPENDENT_SOURCES)
+        with api.working_directory(self.source_dir):
+            config = api.parse_doxyfile("doxygen.conf")
+            self.assertIn(os.path.join("examples", "use_alpha.cpp"),
+                          api.doxygen_input_files(config))
+            input_files = api.doxygen_input_files(config, only_input=True)
+        self.assertEqual(input_files, [
+            os.path.join("include", "alpha", "alpha.hpp"),
+            os.path.join("include", "beta", "beta.hpp"),
+        ])
+        self.assertEqual(len(api.plan_doxygen_shards(
+            [os.path.join(self.source_dir, path) for path in input_files],
+            2)), 2)
+
+    def run_sharded(self, sources: dict) -> bool:
+        self.write_fixture(sources)
+        with api.working_directory(self.source_dir):
+            config = api.parse_doxyfile("doxygen.conf")
+            api.run_doxygen_sharded("doxygen.conf", config, 2,
+                                    self.scratch_dir)
+            for index in range(2):
+                with open(os.path.join(self.scratch_dir, f"shard-{index}",
+                                       "doxygen.conf")) as f:
+                    self.assertNotIn("use_alpha.cpp", f.read())
+            return api.verify_sharded_doxygen("doxygen.conf", config,
+                                              self.scratch_dir)
+
+    @unittest.skipIf(shutil.which("doxygen") is None, "doxygen not installed")
+    def test_independent_shards_match_serial(self):
+        self.assertTrue(self.run_sharded(INDEPENDENT_SOURCES))
+
+    @unittest.skipIf(shutil.which("doxygen") is None, "doxygen not installed")
+    def test_cross_shard_inheritance_falls_back_to_serial(self):
+        self.assertFalse(self.run_sharded(CROSS_SHARD_SOURCES))
+        # The serial output replaced the merged output
+        serial_xml = os.path.join(self.scratch_dir, "serial", "xml")
+        xml_dir = os.path.join(self.source_dir, "build", "xml")
+        self.assertEqual(api.doxygen_xml_signature(xml_dir),
+                         api.doxygen_xml_signature(serial_xml))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+# Copyright 2024 - 2025 Khalil Estell and the libhal contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of upsert_github_pr() against a local stub of the GitHub GraphQL API.
+
+Both scripts carry their own copy of the GitHub client, so every test runs
+against scripts/api.py and .github/scripts/api_deploy.py.
+"""
+
+import http.server
+import importlib.util
+import json
+import os
+import threading
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = {
+    "api": os.path.join(ROOT, "scripts", "api.py"),
+    "api_deploy": os.path.join(ROOT, ".github", "scripts", "api_deploy.py"),
+}
+PR_URL = "https://github.com/libhal/api/pull/7"
+
+
+def load_script(name: str):
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS[name])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StubGraphQL(http.server.BaseHTTPRequestHandler):
+    """
+    Answers the find query and create mutation from a per-test script.
+
+    `server.open_prs` is the list of PR URLs each find query returns in turn
+    (the last one repeats), and `server.creates` the results of each create
+    mutation: a URL, or an error message.
+    """
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        server.requests.append(body)
+        if body["query"].lstrip().startswith("mutation"):
+            outcome = server.creates.pop(0)
+            if outcome.startswith("https://"):
+                reply = {"data": {"createPullRequest": {
+                    "pullRequest": {"url": outcome}}}}
+            else:
+                reply = {"data": None, "errors": [{"message": outcome}]}
+        else:
+            url = (server.open_prs.pop(0) if len(server.open_prs) > 1
+                   else server.open_prs[0])
+            reply = {"data": {"repository": {
+                "id": "R_1",
+                "pullRequests": {"nodes": [{"url": url}] if url else []},
+            }}}
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UpsertGitHubPrTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0),
+                                                      StubGraphQL)
+        self.server.requests = []
+        self.server.open_prs = [None]
+        self.server.creates = []
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        # upsert_github_pr() creates its client from the environment
+        environment = mock.patch.dict(os.environ, {
+            "GITHUB_API_URL": f"http://127.0.0.1:{self.server.server_port}",
+        })
+        environment.start()
+        self.addCleanup(environment.stop)
+        os.environ.pop("GITHUB_GRAPHQL_URL", None)
+
+    def upsert(self, module):
+        return module.upsert_github_pr(token="token",
+                                       repo="libhal/api",
+                                       title="Add docs",
+                                       body="Adds docs",
+                                       head="libhal-arm")
+
+    def mutations(self):
+        return [request for request in self.server.requests
+                if request["query"].lstrip().startswith("mutation")]
+
+    def test_existing_pr_is_found(self):
+        for name in SCRIPTS:
+            with self.subTest(script=name):
+                self.server.requests.clear()
+                self.server.open_prs = [PR_URL]
+                self.assertEqual(self.upsert(load_script(name)),
+                                 (PR_URL, False))
+                self.assertEqual(self.mutations(), [])
+
+    def test_missing_pr_is_created(self):
+        for name in SCRIPTS:
+            with self.subTest(script=name):
+                self.server.requests.clear()
+                self.server.open_prs = [None]
+                self.server.creates = [PR_URL]
+                self.assertEqual(self.upsert(load_script(name)),
+                                 (PR_URL, True))
+                variables = self.mutations()[0]["variables"]
+                self.assertEqual(variables["repositoryId"], "R_1")
+                self.assertEqual(variables["head"], "libhal-arm")
+
+    def test_concurrently_created_pr_is_returned(self):
+        for name in SCRIPTS:
+            with self.subTest(script=name):
+                self.server.requests.clear()
+                self.server.open_prs = [None, PR_URL]
+                self.server.creates = [
+                    "A pull request already exists for libhal:libhal-arm."]
+                self.assertEqual(self.upsert(load_script(name)),
+                                 (PR_URL, False))
+
+    def test_concurrent_pr_closed_before_lookup_is_recreated(self):
+        for name in SCRIPTS:
+            with self.subTest(script=name):
+                self.server.requests.clear()
+                self.server.open_prs = [None]
+                self.server.creates = [
+                    "A pull request already exists for libhal:libhal-arm.",
+                    PR_URL]
+                self.assertEqual(self.upsert(load_script(name)),
+                                 (PR_URL, True))
+                self.assertEqual(len(self.mutations()), 2)
+
+    def test_other_errors_are_raised(self):
+        for name in SCRIPTS:
+            with self.subTest(script=name):
+                module = load_script(name)
+                self.server.open_prs = [None]
+                self.server.creates = ["Resource not accessible by token"]
+                with self.assertRaises(module.GitHubGraphQLError):
+                    self.upsert(module)
+
+
+if __name__ == "__main__":
+    unittest.main()